@@ -1,3 +1,8 @@
+import asyncio
+import hashlib
+import logging
+import mmap
+import pickle
 import sys
 from pathlib import Path
 
@@ -6,8 +11,8 @@ project_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(project_root))
 
 from src.config import get_settings
-from src.data_processing import load_estin_regulations, chunk_by_articles
-from src.embeddings import get_embeddings
+from src.data_processing import load_estin_regulations, load_toc, chunk_by_articles
+from src.embeddings import get_embeddings, embed_documents_batched
 from src.vectorstore import create_vector_store, delete_index
 
 def build_index(reset: bool = False):
@@ -20,17 +25,61 @@ def build_index(reset: bool = False):
         raise FileNotFoundError(f"PDF not found: {pdf_path}")
     
     
-    # Step 1: Load documents
-    documents = load_estin_regulations(str(pdf_path))
-    print(f"Loaded {len(documents)} pages")
+    # 💡 Chunks are cached per PDF content hash and loader/chunker source
+    # hash: an unchanged PDF skips loading and chunking, and any change to
+    # the pipeline code gets a new cache file automatically.
+    # The PDF is hashed through a read-only mapping (no copy into Python bytes)
+    with open(pdf_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        digest = hashlib.sha256(mm).hexdigest()
+    cache_path = project_root / "data" / "cache" / f"chunks-{digest}-{_pipeline_digest()}.pkl"
     
-    # Step 2: Chunk by articles
-    chunks = chunk_by_articles(documents, include_section_context=True)
-    print(f"Created {len(chunks)} article chunks")
+    if cache_path.exists():
+        with open(cache_path, "rb") as f:
+            chunks = pickle.load(f)
+        print(f"Loaded {len(chunks)} article chunks from cache")
+    else:
+        # Step 1: Load documents
+        documents = load_estin_regulations(str(pdf_path))
+        print(f"Loaded {len(documents)} pages")
+        
+        # Step 2: Chunk by articles
+        chunks = chunk_by_articles(
+            documents,
+            include_section_context=True,
+            toc=load_toc(str(pdf_path)),
+        )
+        print(f"Created {len(chunks)} article chunks")
+        
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "wb") as f:
+            pickle.dump(chunks, f)
     
     # Step 3: Initialize embeddings
-    embeddings = get_embeddings(api_key=settings.hf_api_key)
+    # 💡 The on-disk cache means only new or edited articles hit the API
+    embeddings = get_embeddings(
+        api_key=settings.hf_api_key,
+        tei_url=settings.tei_url,
+        cache_path=str(project_root / "data" / "embed_cache.sqlite"),
+    )
     print(f"embeddings initialized")
+    
+    # Embed chunks in concurrent batches
+    vectors = asyncio.run(embed_documents_batched(embeddings, chunks))
+    print(f"Embedded {len(vectors)} chunks")
+
+    # Local backend: an in-process HNSW index written to disk
+    if settings.vector_backend == "faiss":
+        # Optional dependency (faiss extra), imported only when selected
+        from src.vectorstore.faiss_store import create_faiss_store
+        print("\n🗄️  Creating FAISS store...")
+        vector_store = create_faiss_store(
+            documents=chunks,
+            embeddings=embeddings,
+            persist_dir=str(project_root / settings.faiss_index_dir),
+            vectors=vectors,
+        )
+        print("Index build completed successfully!")
+        return vector_store
 
     # Step 4: Create or reset index
     index_name = settings.pinecone_index_name
@@ -49,6 +98,9 @@ def build_index(reset: bool = False):
         embeddings=embeddings,
         pinecone_api_key=settings.pinecone_api_key,
         index_name=settings.pinecone_index_name,
+        vectors=vectors,
+        cloud=settings.pinecone_cloud,
+        region=settings.pinecone_region,
     )
     
     print("Index build completed successfully!")
@@ -56,8 +108,18 @@ def build_index(reset: bool = False):
     return vector_store
 
 
+def _pipeline_digest() -> str:
+    # Hash of the code that produces the chunks
+    pipeline = hashlib.sha256()
+    for module in ("loaders.py", "chunkers.py"):
+        pipeline.update((project_root / "src" / "data_processing" / module).read_bytes())
+    return pipeline.hexdigest()[:12]
+
+
 if __name__ == "__main__":
     
+    # Show progress logged by src.vectorstore
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
  
     try:
         build_index(reset=True)
@@ -4,29 +4,54 @@ API Dependencies - Dependency injection for FastAPI.
 This module manages the lifecycle of expensive resources like:
 - Embeddings model
 - Vector store connection
+- BM25 index (hybrid search)
 - RAG Agent
+- Answer cache for repeated questions
 
 Using dependency injection ensures these are created once and reused.
 """
 
+import hashlib
 from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional
 
-from src.config.settings import get_settings
+from cachetools import TTLCache
+
+from src.config.settings import Settings, get_settings
+from src.data_processing import load_estin_regulations, load_toc, chunk_by_articles
 from src.embeddings import get_embeddings
 from src.vectorstore import load_vector_store
-from src.rag import create_estin_agent
+from src.rag import BM25Index, create_estin_agent
+
 
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+# Regulation PDF (same file scripts/build_index.py indexes)
+PDF_PATH = PROJECT_ROOT / "data" / "documents" / "Reglement-interieur-ESTIN.pdf"
 
-# Global instances (initialized on first request)
+
+# Global instances (initialized at startup, or on first request as a fallback)
 _vector_store = None
 _agent = None
 
+# Answers to questions asked outside a conversation, keyed by normalized question
+_answer_cache: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+
+
+async def get_settings_dependency() -> Settings:
+    """Settings for route dependencies.
+
+    Declared async so FastAPI calls it on the event loop instead of
+    dispatching a sync dependency to its thread pool on every request.
+    """
+    return get_settings()
+
 
 @lru_cache()
 def get_embeddings_instance():
     """Get or create the embeddings model (singleton)."""
     settings = get_settings()
-    return get_embeddings(api_key=settings.hf_api_key)
+    return get_embeddings(api_key=settings.hf_api_key, tei_url=settings.tei_url)
 
 
 def get_vector_store_instance():
@@ -35,14 +60,36 @@ def get_vector_store_instance():
     if _vector_store is None:
         settings = get_settings()
         embeddings = get_embeddings_instance()
-        _vector_store = load_vector_store(
-            embeddings=embeddings,
-            pinecone_api_key=settings.pinecone_api_key,
-            index_name=settings.pinecone_index_name,
-        )
+        if settings.vector_backend == "faiss":
+            # Optional dependency (faiss extra), imported only when selected
+            from src.vectorstore.faiss_store import load_faiss_store
+            _vector_store = load_faiss_store(
+                embeddings=embeddings,
+                persist_dir=str(PROJECT_ROOT / settings.faiss_index_dir),
+            )
+        else:
+            _vector_store = load_vector_store(
+                embeddings=embeddings,
+                pinecone_api_key=settings.pinecone_api_key,
+                index_name=settings.pinecone_index_name,
+            )
     return _vector_store
 
 
+@lru_cache()
+def get_bm25_index_instance() -> BM25Index:
+    """Get or create the BM25 index over the regulation chunks (singleton)."""
+    # 💡 Chunked with the same pipeline as build_index, so the texts match
+    # the ones stored in Pinecone and fusion can merge them
+    documents = load_estin_regulations(str(PDF_PATH))
+    chunks = chunk_by_articles(
+        documents,
+        include_section_context=True,
+        toc=load_toc(str(PDF_PATH)),
+    )
+    return BM25Index(chunks)
+
+
 def get_agent_instance():
     """Get or create the RAG agent (singleton)."""
     global _agent
@@ -52,6 +99,21 @@ def get_agent_instance():
         _agent = create_estin_agent(
             groq_api_key=settings.groq_api_key,
             vector_store=vector_store,
+            bm25_index=get_bm25_index_instance() if settings.hybrid_search else None,
+            mmr=settings.retrieval_mmr,
         )
     return _agent
 
+
+def _question_key(question: str) -> str:
+    return hashlib.sha256(question.strip().lower().encode()).hexdigest()
+
+
+def get_cached_answer(question: str) -> Optional[Any]:
+    """Return the cached answer for a question, or None on a miss."""
+    return _answer_cache.get(_question_key(question))
+
+
+def cache_answer(question: str, answer: Any) -> None:
+    """Store the answer to a question asked without conversation context."""
+    _answer_cache[_question_key(question)] = answer
@@ -1,8 +1,13 @@
+import asyncio
+import json
+import logging
 import sys
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 from uuid import uuid4
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
 
 project_root = Path(__file__).parent.parent.parent
 if str(project_root) not in sys.path:
@@ -11,15 +16,38 @@ if str(project_root) not in sys.path:
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 from src.config.settings import Settings, get_settings
 
+log = logging.getLogger(__name__)
+
 # Frontend directory path
 FRONTEND_DIR = Path(__file__).parent.parent.parent / "frontend"
-from src.rag import invoke_agent, get_last_message
-from src.api.dependencies import get_agent_instance
+
+# Worker threads available for blocking calls (startup, cached-answer writes)
+AGENT_THREADPOOL_SIZE = 100
+
+# Maximum number of source documents returned with an answer
+MAX_SOURCES = 5
+
+from src.rag import (
+    ainvoke_agent,
+    astream_agent,
+    record_exchange,
+    warm_up_agent,
+    get_last_message,
+)
+from src.vectorstore import warmup
+from src.api.dependencies import (
+    get_agent_instance,
+    get_vector_store_instance,
+    get_bm25_index_instance,
+    get_settings_dependency,
+    get_cached_answer,
+    cache_answer,
+)
 
 
 
@@ -65,7 +93,33 @@ class ErrorResponse(BaseModel):
 async def lifespan(app: FastAPI):
     
     # Startup
+    # Library modules log through `logging`; configured here, when the app
+    # runs, so importing src never touches the root logger
+    logging.basicConfig(
+        level=get_settings().log_level,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
     print("Starting ESTIN RAG API...")
+    # 💡 Blocking work runs in asyncio.to_thread; size its pool for concurrent
+    # requests rather than the default min(32, cpu_count + 4)
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=AGENT_THREADPOOL_SIZE)
+    )
+    # 💡 Build embeddings, vector store and agent before serving, in a worker
+    # thread, so the first /ask does not pay (or block the loop for) the init
+    agent = await asyncio.to_thread(get_agent_instance)
+    # First search pays model load and connection setup: do it now
+    # 💡 Best effort: a cold or briefly unavailable backend (HF 503 while the
+    # model loads, Pinecone timeout) must not keep the API from starting
+    try:
+        await warmup(get_vector_store_instance())
+        if get_settings().hybrid_search:
+            # Compiles bm25s's numba scorer (not cached on disk)
+            await asyncio.to_thread(get_bm25_index_instance().search, "article", 1)
+    except Exception as e:
+        log.warning("Retrieval warm-up failed: %s", e)
+    if get_settings().warmup_on_startup:
+        await asyncio.to_thread(warm_up_agent, agent)
     yield
     # Shutdown
     print("Shutting down ESTIN RAG API...")
@@ -91,13 +145,33 @@ app = FastAPI(
 # CORS Middleware
 # =============================================================================
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+class _SettingsCORSMiddleware:
+    """CORS configured from settings, read when the app starts rather than at
+    import (importing `src` must not require the API keys)."""
+
+    def __init__(self, app):
+        self.app = app
+        self.handler = None
+
+    async def __call__(self, scope, receive, send):
+        if self.handler is None:
+            settings = get_settings()
+            # 💡 In production the frontend is served from this app (same
+            # origin), so requests go straight to the app without CORS checks
+            if settings.environment == "production":
+                self.handler = self.app
+            else:
+                self.handler = CORSMiddleware(
+                    self.app,
+                    allow_origins=settings.cors_allowed_origins,
+                    allow_credentials=False,
+                    allow_methods=["GET", "POST"],
+                    allow_headers=["Content-Type", "Authorization"],
+                )
+        await self.handler(scope, receive, send)
+
+
+app.add_middleware(_SettingsCORSMiddleware)
 
 
 # =============================================================================
@@ -170,7 +244,7 @@ async def api_root():
 )
 async def ask_question(
     request: QuestionRequest,
-    settings: Settings = Depends(get_settings),
+    settings: Settings = Depends(get_settings_dependency),
 ):
     
     try:
@@ -180,8 +254,26 @@ async def ask_question(
         # Get the agent
         agent = get_agent_instance()
         
+        # A question that starts a new conversation can be answered from cache
+        # 💡 Follow-ups depend on history, so never cached
+        new_thread = await _is_new_thread(agent, request.thread_id)
+        if new_thread:
+            cached = get_cached_answer(request.question)
+            if cached is not None:
+                answer, sources = cached
+                await asyncio.to_thread(
+                    record_exchange, agent, request.question, answer, thread_id
+                )
+                return AnswerResponse(
+                    answer=answer,
+                    thread_id=thread_id,
+                    sources=sources,
+                )
+        
         # Invoke the agent
-        result = invoke_agent(agent, request.question, thread_id=thread_id)
+        # 💡 Native async: Groq and Pinecone round-trips are awaited, so the
+        # event loop keeps serving other requests meanwhile
+        result = await ainvoke_agent(agent, request.question, thread_id)
         
         # Extract the answer
         answer = get_last_message(result)
@@ -189,6 +281,9 @@ async def ask_question(
         # Extract sources from tool calls if available
         sources = _extract_sources(result)
         
+        if new_thread:
+            cache_answer(request.question, (answer, sources))
+        
         return AnswerResponse(
             answer=answer,
             thread_id=thread_id,
@@ -202,26 +297,104 @@ async def ask_question(
         )
 
 
+@app.post(
+    "/api/v1/ask/stream",
+    tags=["RAG"],
+    summary="Poser une question (réponse en flux)",
+)
+async def ask_question_stream(
+    request: QuestionRequest,
+    settings: Settings = Depends(get_settings_dependency),
+):
+    """Server-sent events: one `token` event per generated chunk, then a
+    `done` event carrying the full AnswerResponse (thread_id, sources)."""
+    thread_id = request.thread_id or str(uuid4())
+    agent = get_agent_instance()
+    
+    async def event_stream():
+        try:
+            # Same answer cache as /ask, replayed as a single token
+            cached = None
+            new_thread = await _is_new_thread(agent, request.thread_id)
+            if new_thread:
+                cached = get_cached_answer(request.question)
+            
+            if cached is not None:
+                answer, sources = cached
+                await asyncio.to_thread(
+                    record_exchange, agent, request.question, answer, thread_id
+                )
+                yield _sse("token", {"token": answer})
+            else:
+                # 💡 Tokens are forwarded as Groq produces them: the first
+                # words reach the client long before the answer is complete
+                result = None
+                async for kind, payload in astream_agent(agent, request.question, thread_id):
+                    if kind == "token":
+                        yield _sse("token", {"token": payload})
+                    else:
+                        result = payload
+                
+                answer = get_last_message(result)
+                sources = _extract_sources(result)
+                
+                if new_thread:
+                    cache_answer(request.question, (answer, sources))
+            
+            response = AnswerResponse(answer=answer, thread_id=thread_id, sources=sources)
+            yield _sse("done", response.model_dump())
+        
+        except Exception as e:
+            # Headers are already sent: report the failure in the stream
+            yield _sse("error", {
+                "error": f"Erreur lors du traitement de la question: {str(e)}"
+            })
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+async def _is_new_thread(agent, thread_id: Optional[str]) -> bool:
+    # 💡 The frontend creates its thread_id before the first question, so a
+    # conversation is new when its thread has no messages yet
+    if thread_id is None:
+        return True
+    state = await agent.aget_state({"configurable": {"thread_id": thread_id}})
+    return not state.values.get("messages")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 # 
 
 def _extract_sources(result: dict) -> list:
     
-    sources = []
     messages = result.get("messages", [])
     
-    for msg in messages:
-        # Check for tool messages with artifacts
-        if hasattr(msg, 'artifact') and msg.artifact:
-            for doc in msg.artifact:
-                if hasattr(doc, 'page_content'):
-                    sources.append(SourceDocument(
-                        content=doc.page_content[:500] + "..." if len(doc.page_content) > 500 else doc.page_content,
-                        article_number=doc.metadata.get("article_number"),
-                        section_number=doc.metadata.get("section_number"),
-                        section_title=doc.metadata.get("section_title"),
-                    ))
+    # Only look at the current turn (messages after the last user question);
+    # earlier turns of the thread already returned their sources
+    current_turn = []
+    for msg in reversed(messages):
+        if getattr(msg, "type", None) == "human":
+            break
+        current_turn.append(msg)
+    current_turn.reverse()
+    
+    # Tool messages carry the retrieved documents as artifacts
+    docs = chain.from_iterable(
+        msg.artifact for msg in current_turn if getattr(msg, "artifact", None)
+    )
     
-    return sources
+    return [
+        SourceDocument(
+            content=doc.page_content[:500] + ("..." if len(doc.page_content) > 500 else ""),
+            article_number=doc.metadata.get("article_number"),
+            section_number=doc.metadata.get("section_number"),
+            section_title=doc.metadata.get("section_title"),
+        )
+        for doc in islice(docs, MAX_SOURCES)
+    ]
 
 
 
@@ -230,10 +403,20 @@ if __name__ == "__main__":
     import uvicorn
 
     settings = get_settings()
+    development = settings.environment == "development"
     uvicorn.run(
-        app,
+        "src.api.main:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=False,
+        # 💡 uvloop + httptools (shipped with uvicorn[standard]) are much faster
+        # than asyncio + h11; uvloop is not available on Windows
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        # Each worker runs lifespan, so every process builds its own agent.
+        # ⚠️ Conversation memory (MemorySaver) and the answer cache are per
+        # process: keep API_WORKERS=1 unless follow-ups are routed to the
+        # same worker (sticky sessions)
+        workers=1 if development else settings.api_workers,
+        reload=development,
     )
 
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -15,11 +16,32 @@ class Settings(BaseSettings):
     pinecone_cloud: str = "aws"
     pinecone_region: str = "us-east-1"
     
+    # Vector store backend: "pinecone" (production) or "faiss" (local/dev/CI)
+    vector_backend: str = "pinecone"
+    faiss_index_dir: str = "data/faiss_index"
+    
+    # Retrieval: diversify results with maximal marginal relevance
+    retrieval_mmr: bool = False
+    
+    # Retrieval: fuse Pinecone results with an in-process BM25 index
+    hybrid_search: bool = False
+    
+    # Embeddings: URL of a local Text Embeddings Inference server (optional)
+    tei_url: Optional[str] = None
+    
     # Application Settings
     environment: str = "development"
     api_host: str = "127.0.0.1"
     api_port: int = 8000
+    # Uvicorn worker processes outside development. Conversation memory is
+    # per process, so more than 1 needs sticky sessions
+    api_workers: int = 1
+    # Origins allowed by CORS (JSON list in .env); the bundled frontend is
+    # same-origin and does not need an entry
+    cors_allowed_origins: List[str] = ["http://localhost:3000"]
     log_level: str = "INFO"
+    # Send a warm-up question at startup to prime the LLM prompt cache
+    warmup_on_startup: bool = False
     
     
     # Pydantic Settings Configuration
@@ -1,5 +1,4 @@
-from .loaders import load_estin_regulations
-from .chunkers import chunk_by_articles
-
-__all__ = ["load_estin_regulations", "chunk_by_articles"]
+from .loaders import load_estin_regulations, load_toc
+from .chunkers import chunk_by_articles, build_source_label
 
+__all__ = ["load_estin_regulations", "load_toc", "chunk_by_articles", "build_source_label"]
@@ -1,22 +1,59 @@
 
 import re
-from typing import List
+from bisect import bisect_right
+from typing import List, Optional, Tuple
 from langchain_core.documents import Document
 from .loaders import get_full_text
 
 
+# Patterns for parsing, compiled once at import time
+# 💡 re.MULTILINE makes ^ and $ match line boundaries
+# 💡 Case-sensitive: only matches "Article" (capital A), not "article"
+# 💡 ^[ ]* allows optional leading spaces (some PDFs have spaces before "Article")
+# 💡 ^ ensures "Article" is at the start of a line (with optional spaces), preventing false matches
+_STRUCTURE_RE = re.compile(
+    r'(?P<section>^(?P<section_num>\d+)\s+(?P<section_title>[A-ZÉÈÀ][A-ZÉÈÀ\s]+)$)'
+    r'|(?P<subsection>^(?P<subsection_num>\d+\.\d+)\s+(?P<subsection_title>.+)$)'
+    r'|(?P<article>^[ ]*Article\s+(?P<article_num>\d+)\s*:?)',
+    re.MULTILINE,
+)
+
+# Numbered outline titles, e.g. "3 HYGIENE ET SECURITE" or "3.2 - Locaux"
+_TOC_TITLE_RE = re.compile(r'^(\d+(?:\.\d+)*)\s*[.:\-]?\s*(.*)$')
+
+# Cleanup pattern used by _clean_text
+# 💡 One alternation covers the three whitespace/page-number rules so the
+# text is walked once instead of three times
+_CLEANUP_RE = re.compile(
+    r'(?P<nl>\n{3,})|(?P<sp> {2,})|(?P<num>^\d+$)',
+    re.MULTILINE,
+)
+_CLEANUP_REPLACEMENTS = {
+    "nl": "\n\n",  # Max 2 newlines
+    "sp": " ",  # Max 1 space
+    "num": "",  # Remove page numbers that appear alone
+}
+
+
 def chunk_by_articles(
     documents: List[Document],
     include_section_context: bool = True,
+    toc: Optional[List[Tuple[int, str, int]]] = None,
 ) -> List[Document]:
     # Combine all pages using the loader utility function
-    full_text = get_full_text(documents)
+    full_text, page_offsets = get_full_text(documents)
     
     # Get source metadata from first document
     source_metadata = documents[0].metadata if documents else {}
     
+    # 💡 When the PDF has an outline (see load_toc), sections are assigned by
+    # page instead of being re-detected with regexes in every article
+    section_index = _build_section_index(toc) if toc else None
+    
     # Parse the document structure
-    chunks = _parse_document_structure(full_text, source_metadata, include_section_context)
+    chunks = _parse_document_structure(
+        full_text, page_offsets, source_metadata, include_section_context, section_index
+    )
     
     print(f"📑 Created {len(chunks)} article-based chunks")
     
@@ -25,8 +62,10 @@ def chunk_by_articles(
 
 def _parse_document_structure(
     text: str,
+    page_offsets: List[Tuple[int, int]],
     base_metadata: dict,
     include_section_context: bool,
+    section_index: Optional[Tuple[List[int], List[Tuple[str, str, str, str]]]] = None,
 ) -> List[Document]:
     
     chunks = []
@@ -37,96 +76,178 @@ def _parse_document_structure(
     current_subsection = ""
     current_subsection_num = ""
     
-    # Patterns for parsing
-    # 💡 re.MULTILINE makes ^ and $ match line boundaries
-    # 💡 Case-sensitive: only matches "Article" (capital A), not "article"
-    section_pattern = re.compile(r'^(\d+)\s+([A-ZÉÈÀ][A-ZÉÈÀ\s]+)$', re.MULTILINE)
-    subsection_pattern = re.compile(r'^(\d+\.\d+)\s+(.+)$', re.MULTILINE)
-    article_pattern = re.compile(r'^Article\s+(\d+)\s*:?\s*(.*)', re.MULTILINE)
-    
-    # Split text by articles
-    # 💡 Case-sensitive: only matches "Article" (capital A), not "article" in text
-    # 💡 ^[ ]* allows optional leading spaces (some PDFs have spaces before "Article")
-    # 💡 ^ ensures "Article" is at the start of a line (with optional spaces), preventing false matches
-    parts = re.split(r'(^[ ]*Article\s+\d+\s*:?)', text, flags=re.MULTILINE)
-    
-    # Process the text before the first article (section headers, intro)
-    if parts:
-        intro_text = parts[0]
+    # Page lookup by character offset
+    page_numbers = [page for page, _ in page_offsets]
+    page_starts = [offset for _, offset in page_offsets]
+    
+    # Header match of the article being read
+    article_match = None
+    
+    # 💡 One forward pass over section, subsection and article matches.
+    # An article's body runs from the end of its header to the next header;
+    # section/subsection lines found in that body update the context before
+    # the article is flushed.
+    for match in _STRUCTURE_RE.finditer(text):
+        kind = match.lastgroup
         
-        # Find all section/subsection updates in intro
-        for match in section_pattern.finditer(intro_text):
-            current_section_num = match.group(1)
-            current_section = match.group(2).strip()
-            
-        for match in subsection_pattern.finditer(intro_text):
-            current_subsection_num = match.group(1)
-            current_subsection = match.group(2).strip()
-    
-    # Process articles
-    i = 1
-    while i < len(parts):
-        if i + 1 < len(parts):
-            article_header = parts[i]  # "Article X :" or possibly "article X"
-            article_body = parts[i + 1]  # The article content
-            
-            # CRITICAL: Only process headers that start with "Article" (A majuscule)
-            # Ignore "article" (a minuscule) which might appear in content
-            if not article_header.strip().startswith('Article'):
-                # Skip this split - it's not a real article header, just content
-                i += 2
+        if kind in ("section", "subsection"):
+            # With an outline, sections come from _lookup_section instead
+            if section_index:
                 continue
-            
-            # Extract article number
-            # 💡 Case-sensitive: only matches "Article" (capital A)
-            article_match = re.match(r'Article\s+(\d+)', article_header)
-            article_num = article_match.group(1) if article_match else "?"
-            
-            # Update context from this article's text
-            for match in section_pattern.finditer(article_body):
-                current_section_num = match.group(1)
-                current_section = match.group(2).strip()
-                
-            for match in subsection_pattern.finditer(article_body):
-                current_subsection_num = match.group(1)
-                current_subsection = match.group(2).strip()
-            
-            # Build the chunk content
-            if include_section_context:
-                context_header = _build_context_header(
-                    current_section_num, current_section,
-                    current_subsection_num, current_subsection
-                )
-                chunk_content = f"{context_header}\n\n{article_header.strip()}{article_body.strip()}"
+            if kind == "section":
+                current_section_num = match.group("section_num")
+                current_section = match.group("section_title").strip()
             else:
-                chunk_content = f"{article_header.strip()}{article_body.strip()}"
-            
-            # Clean up the content
-            chunk_content = _clean_text(chunk_content)
+                current_subsection_num = match.group("subsection_num")
+                current_subsection = match.group("subsection_title").strip()
+            continue
+        
+        # New article header: flush the previous article
+        if article_match is not None:
+            article_page = _page_at(page_numbers, page_starts, article_match.start())
+            if section_index:
+                (
+                    current_section_num, current_section,
+                    current_subsection_num, current_subsection,
+                ) = _lookup_section(section_index, article_page)
             
-            # Only create chunk if there's meaningful content
-            if len(chunk_content.strip()) > 50:
-                # Create metadata for this chunk
-                # 💡 Metadata enables filtering: "find articles in Section 5"
-                chunk_metadata = {
-                    **base_metadata,
-                    "article_number": int(article_num) if article_num.isdigit() else article_num,
-                    "section_number": current_section_num,
-                    "section_title": current_section,
-                    "subsection_number": current_subsection_num,
-                    "subsection_title": current_subsection,
-                }
-                
-                chunks.append(Document(
-                    page_content=chunk_content,
-                    metadata=chunk_metadata
-                ))
+            chunk = _build_chunk(
+                article_match,
+                text[article_match.end():match.start()],
+                (current_section_num, current_section, current_subsection_num, current_subsection),
+                {**base_metadata, "page": article_page},
+                include_section_context,
+            )
+            if chunk is not None:
+                chunks.append(chunk)
+        
+        article_match = match
+    
+    # Flush the last article (its body runs to the end of the text)
+    if article_match is not None:
+        article_page = _page_at(page_numbers, page_starts, article_match.start())
+        if section_index:
+            (
+                current_section_num, current_section,
+                current_subsection_num, current_subsection,
+            ) = _lookup_section(section_index, article_page)
         
-        i += 2
+        chunk = _build_chunk(
+            article_match,
+            text[article_match.end():],
+            (current_section_num, current_section, current_subsection_num, current_subsection),
+            {**base_metadata, "page": article_page},
+            include_section_context,
+        )
+        if chunk is not None:
+            chunks.append(chunk)
     
     return chunks
 
 
+def _page_at(
+    page_numbers: List[int],
+    page_starts: List[int],
+    offset: int,
+) -> Optional[int]:
+    # Page containing the given character offset of the full text
+    position = bisect_right(page_starts, offset) - 1
+    return page_numbers[position] if position >= 0 else None
+
+
+def _build_chunk(
+    article_match: re.Match,
+    article_body: str,
+    context: Tuple[str, str, str, str],
+    base_metadata: dict,
+    include_section_context: bool,
+) -> Optional[Document]:
+    
+    section_num, section_title, subsection_num, subsection_title = context
+    article_header = article_match.group("article")  # "Article X :"
+    article_num = article_match.group("article_num")
+    
+    # Build the chunk content
+    if include_section_context:
+        context_header = _build_context_header(
+            section_num, section_title,
+            subsection_num, subsection_title
+        )
+        chunk_content = f"{context_header}\n\n{article_header.strip()}{article_body.strip()}"
+    else:
+        chunk_content = f"{article_header.strip()}{article_body.strip()}"
+    
+    # Clean up the content
+    chunk_content = _clean_text(chunk_content)
+    
+    # Only create chunk if there's meaningful content
+    if len(chunk_content.strip()) <= 50:
+        return None
+    
+    # Create metadata for this chunk
+    # 💡 Metadata enables filtering: "find articles in Section 5"
+    chunk_metadata = {
+        **base_metadata,
+        "article_number": int(article_num),
+        "section_number": section_num,
+        "section_title": section_title,
+        "subsection_number": subsection_num,
+        "subsection_title": subsection_title,
+        # 💡 Display string precomputed at ingest, so retrieval formatting
+        # does not rebuild it for every result
+        "source_label": build_source_label(
+            section_num, section_title, subsection_num, subsection_title
+        ),
+    }
+    
+    return Document(
+        page_content=chunk_content,
+        metadata=chunk_metadata
+    )
+
+
+def _build_section_index(
+    toc: List[Tuple[int, str, int]],
+) -> Tuple[List[int], List[Tuple[str, str, str, str]]]:
+    # Turn the outline into parallel lists sorted by start page:
+    # start pages, and the (section_num, section_title, subsection_num,
+    # subsection_title) context in effect from that page on
+    starts = []
+    contexts = []
+    
+    section_num = section_title = subsection_num = subsection_title = ""
+    
+    for level, title, page in toc:
+        match = _TOC_TITLE_RE.match(title.strip())
+        # Same rule at both levels: the number when the title has one,
+        # otherwise "" (never invented); the title is always kept
+        number, name = (match.group(1), match.group(2).strip()) if match else ("", title.strip())
+        
+        if level == 1:
+            section_num = number
+            section_title = name
+            subsection_num = subsection_title = ""
+        elif level == 2:
+            subsection_num = number
+            subsection_title = name
+        else:
+            continue
+        
+        starts.append(page)
+        contexts.append((section_num, section_title, subsection_num, subsection_title))
+    
+    return starts, contexts
+
+
+def _lookup_section(
+    section_index: Tuple[List[int], List[Tuple[str, str, str, str]]],
+    page: Optional[int],
+) -> Tuple[str, str, str, str]:
+    starts, contexts = section_index
+    position = bisect_right(starts, page) - 1 if page is not None else -1
+    return contexts[position] if position >= 0 else ("", "", "", "")
+
+
 def _build_context_header(
     section_num: str,
     section_title: str,
@@ -134,28 +255,48 @@ def _build_context_header(
     subsection_title: str,
 ) -> str:
     
-    parts = []
-    
-    if section_num and section_title:
-        parts.append(f"[Section {section_num}: {section_title}]")
-    
-    if subsection_num and subsection_title:
-        parts.append(f"[Sous-section {subsection_num}: {subsection_title}]")
+    parts = [
+        f"[{heading}]"
+        for heading in (
+            _heading("Section", section_num, section_title),
+            _heading("Sous-section", subsection_num, subsection_title),
+        )
+        if heading
+    ]
     
     return "\n".join(parts)
 
 
-def _clean_text(text: str) -> str:
-    # Remove page markers if any
-    text = re.sub(r'\[PAGE \d+\]', '', text)
-    
-    # Remove excessive whitespace
-    text = re.sub(r'\n{3,}', '\n\n', text)  # Max 2 newlines
-    text = re.sub(r' {2,}', ' ', text)  # Max 1 space
-    
-    # Remove page numbers that appear alone
-    text = re.sub(r'^\d+$', '', text, flags=re.MULTILINE)
+def build_source_label(
+    section_num: str,
+    section_title: str,
+    subsection_num: str,
+    subsection_title: str,
+) -> str:
+    """Human-readable location of a chunk, e.g. "Section 3: ... > Sous-section 3.1: ..."."""
+    parts = [
+        heading
+        for heading in (
+            _heading("Section", section_num, section_title),
+            _heading("Sous-section", subsection_num, subsection_title),
+        )
+        if heading
+    ]
     
-    return text.strip()
+    return " > ".join(parts) if parts else "Règlement Intérieur ESTIN"
+
+
+def _heading(label: str, num: str, title: str) -> str:
+    # "Section 3: Titre", "Section: Titre" when unnumbered, "" without a title
+    if not title:
+        return ""
+    return f"{label} {num}: {title}" if num else f"{label}: {title}"
 
 
+def _clean_text(text: str) -> str:
+    # Collapse whitespace and drop lone page numbers in a single pass
+    text = _CLEANUP_RE.sub(
+        lambda m: _CLEANUP_REPLACEMENTS[m.lastgroup], text
+    )
+    
+    return text.strip()
@@ -1,4 +1,23 @@
-from .embedder import get_embeddings, embed_documents
-
-__all__ = ["get_embeddings", "embed_documents"]
+from .embedder import (
+    get_embeddings,
+    embed_documents,
+    embed_documents_batched,
+    embed_queries,
+    aembed_queries,
+    TEIEmbeddings,
+    CachedEmbeddings,
+    E5Embeddings,
+)
+from .batcher import AsyncEmbeddingBatcher
 
+__all__ = [
+    "get_embeddings",
+    "embed_documents",
+    "embed_documents_batched",
+    "embed_queries",
+    "aembed_queries",
+    "TEIEmbeddings",
+    "CachedEmbeddings",
+    "E5Embeddings",
+    "AsyncEmbeddingBatcher",
+]
@@ -0,0 +1,73 @@
+
+import asyncio
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+
+from .embedder import aembed_queries
+
+
+class AsyncEmbeddingBatcher:
+    """Coalesces concurrent search-query embeddings into batched calls.
+
+    Queries awaiting `embed` within `max_wait_ms` of each other (up to
+    `max_batch_size`) are sent to the embeddings backend in one request.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        
+        # 💡 The queue and worker belong to the loop that first uses them;
+        # start (or restart) them on the current loop when needed
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._queue.get()]
+            
+            # Collect whatever else arrives within the window
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                vectors = await aembed_queries(
+                    self.embeddings, [text for text, _ in batch]
+                )
+            except Exception as e:
+                # Every caller of the failed batch gets the error
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
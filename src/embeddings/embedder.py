@@ -1,26 +1,239 @@
 
-from typing import List, Optional
+import asyncio
+import hashlib
+import sqlite3
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+import httpx
+import numpy as np
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential,
+)
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_huggingface.embeddings import HuggingFaceEndpointEmbeddings
 
+
+# Connection pool limits for the local TEI server
+_TEI_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+
+
+# 💡 Shared HTTP clients (one connection pool per process), created on first
+# use: processes without TEI_URL never build them
+@lru_cache(maxsize=1)
+def _get_tei_client() -> httpx.Client:
+    return httpx.Client(http2=True, limits=_TEI_LIMITS, timeout=30.0)
+
+
+@lru_cache(maxsize=1)
+def _get_tei_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(http2=True, limits=_TEI_LIMITS, timeout=30.0)
+
+
+class TEIEmbeddings(Embeddings):
+    """Embeddings served by a Text Embeddings Inference server (POST /embed).
+
+    TEI batches requests on the server side, so whole lists of texts are sent
+    in a single call.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        response = _get_tei_client().post(f"{self.base_url}/embed", json={"inputs": texts})
+        response.raise_for_status()
+        return response.json()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        response = await _get_tei_async_client().post(
+            f"{self.base_url}/embed", json={"inputs": texts}
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an embeddings model with an on-disk SQLite cache of document vectors.
+
+    Entries are keyed by SHA-256 of (model name, text), so unchanged chunks are
+    never re-embedded across index builds. Queries are not cached.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache_path: str):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(cache_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, dim INT, vec BLOB)"
+        )
+        self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode()).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        unique_keys = list(set(keys))
+        
+        # 💡 Stay under SQLite's limit on bound parameters per statement
+        for start in range(0, len(unique_keys), 500):
+            batch = unique_keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, vec FROM embeddings WHERE key IN ({placeholders})",
+                batch,
+            )
+            for key, vec in rows:
+                found[key] = np.frombuffer(vec, dtype=np.float32).tolist()
+        
+        return found
+
+    def _store(self, keys: List[str], vectors: List[List[float]]) -> None:
+        # One transaction for the whole batch
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vec) VALUES (?, ?, ?)",
+                [
+                    (key, len(vector), np.asarray(vector, dtype=np.float32).tobytes())
+                    for key, vector in zip(keys, vectors)
+                ],
+            )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(keys)
+        
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            self._store(list(missing), vectors)
+            cached.update(zip(missing, vectors))
+        
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(keys)
+        
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            self._store(list(missing), vectors)
+            cached.update(zip(missing, vectors))
+        
+        return [cached[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
+
+
+class E5Embeddings(Embeddings):
+    """Adds the prefixes E5 models are trained with: "query: " on search
+    queries, "passage: " on indexed documents."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents([f"passage: {text}" for text in texts])
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(f"query: {text}")
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        # Several queries in one request
+        return self.embeddings.embed_documents([f"query: {text}" for text in texts])
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(
+            [f"passage: {text}" for text in texts]
+        )
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(f"query: {text}")
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(
+            [f"query: {text}" for text in texts]
+        )
+
+
 def get_embeddings(
     api_key: str,
     model_name: str = "intfloat/multilingual-e5-large",
-) -> HuggingFaceEndpointEmbeddings:
+    tei_url: Optional[str] = None,
+    cache_path: Optional[str] = None,
+) -> Embeddings:
     
-    embeddings = HuggingFaceEndpointEmbeddings(
-        model=model_name,
-        task="feature-extraction",
-        huggingfacehub_api_token=api_key,
-    )
+    # 💡 A local TEI server (e.g. `text-embeddings-inference --model-id
+    # intfloat/multilingual-e5-large`) avoids the public Inference API round-trip
+    if tei_url:
+        embeddings = TEIEmbeddings(base_url=tei_url)
+        print(f"Initialized TEI embeddings at {tei_url}")
+    else:
+        embeddings = HuggingFaceEndpointEmbeddings(
+            model=model_name,
+            task="feature-extraction",
+            huggingfacehub_api_token=api_key,
+        )
+        # 💡 Let the Inference API answer repeated inputs from its own cache
+        for client in (embeddings.client, embeddings.async_client):
+            client.headers["x-use-cache"] = "true"
+        print(f"Initialized embeddings model: {model_name}")
     
-    print(f"Initialized embeddings model: {model_name}")
+    if cache_path:
+        embeddings = CachedEmbeddings(embeddings, model_name, cache_path)
+        print(f"Embedding cache: {cache_path}")
+    
+    # 💡 Outermost, so every caller (index build, vector stores, tools) gets
+    # the prefixes, and the cache is keyed on the prefixed text
+    if "e5" in model_name.lower():
+        embeddings = E5Embeddings(embeddings)
     
     return embeddings
 
 
+def embed_queries(
+    embeddings: Embeddings,
+    queries: List[str],
+) -> List[List[float]]:
+    """Embed several search queries in one call."""
+    # Query-side prefixes when the model has them; otherwise queries and
+    # documents are embedded the same way
+    if isinstance(embeddings, E5Embeddings):
+        return embeddings.embed_queries(queries)
+    return embeddings.embed_documents(queries)
+
+
+async def aembed_queries(
+    embeddings: Embeddings,
+    queries: List[str],
+) -> List[List[float]]:
+    """Async counterpart of embed_queries."""
+    if isinstance(embeddings, E5Embeddings):
+        return await embeddings.aembed_queries(queries)
+    return await embeddings.aembed_documents(queries)
+
+
 def embed_documents(
-    embeddings: HuggingFaceEndpointEmbeddings,
+    embeddings: Embeddings,
     documents: List[Document],
 ) -> List[List[float]]:
     
@@ -31,3 +244,47 @@ def embed_documents(
     return vectors
 
 
+async def embed_documents_batched(
+    embeddings: Embeddings,
+    documents: List[Document],
+    batch_size: int = 32,
+    concurrency: int = 8,
+) -> List[List[float]]:
+    """Embed documents in fixed-size batches, several batches in flight at once.
+
+    Vectors are returned in the same order as `documents`. A failing batch is
+    retried on its own instead of restarting the whole build.
+    """
+    texts = [doc.page_content for doc in documents]
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def embed_batch(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            return await _aembed_with_retry(embeddings, batch)
+    
+    # 💡 gather keeps results in submission order, so batch i stays at index i
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    
+    return [vector for batch_vectors in results for vector in batch_vectors]
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    # Rate limiting (429) and server errors (5xx) are worth retrying
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+@retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=wait_exponential(multiplier=1, max=30),
+    stop=stop_after_attempt(5),
+    reraise=True,
+)
+async def _aembed_with_retry(
+    embeddings: Embeddings,
+    texts: List[str],
+) -> List[List[float]]:
+    return await embeddings.aembed_documents(texts)
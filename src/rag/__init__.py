@@ -1,13 +1,27 @@
-from .tools import create_retrieval_tool
+from .tools import create_retrieval_tool, create_batch_retrieval_tool
+from .hybrid_retrieval import BM25Index, reciprocal_rank_fusion
 from .agent import (
     create_estin_agent,
+    stream_agent,
+    astream_agent,
     invoke_agent,
+    ainvoke_agent,
+    record_exchange,
+    warm_up_agent,
     get_last_message,
 )
 
 __all__ = [
     "create_retrieval_tool",
+    "create_batch_retrieval_tool",
+    "BM25Index",
+    "reciprocal_rank_fusion",
     "create_estin_agent",
+    "stream_agent",
+    "astream_agent",
     "invoke_agent",
+    "ainvoke_agent",
+    "record_exchange",
+    "warm_up_agent",
     "get_last_message",
 ]
@@ -1,57 +1,22 @@
 
-import os
-from typing import Optional, List, Dict, Any
+import hashlib
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterator, Tuple
+import httpx
 from langchain.agents import create_agent
 from langchain_groq import ChatGroq
-from langchain_pinecone import PineconeVectorStore
+from langchain_core.vectorstores import VectorStore
 from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
 
-from .tools import create_retrieval_tool
+from src.embeddings import AsyncEmbeddingBatcher
+from .tools import create_retrieval_tool, create_batch_retrieval_tool
+from .hybrid_retrieval import BM25Index
 
 
-def create_estin_agent(
-    groq_api_key: str,
-    vector_store: PineconeVectorStore,
-    model_name: str = "openai/gpt-oss-120b",
-    temperature: float = 0.1,
-    k: int = 2,
-):
-    # Set Groq API key
-    os.environ["GROQ_API_KEY"] = groq_api_key
-    
-    # Initialize the LLM
-    llm = ChatGroq(
-        model=model_name,
-        temperature=temperature,
-        max_retries=2,
-    )
-    
-    # Create the retrieval tool
-    retrieval_tool = create_retrieval_tool(vector_store, k=k)
-    
-    # Define the system prompt
-    system_prompt = _get_system_prompt()
-    
-    # Create memory/checkpointer to persist conversation history
-    memory = MemorySaver()
-    
-    # Create the agent with memory
-    agent = create_agent(
-        model=llm,
-        tools=[retrieval_tool],
-        system_prompt=system_prompt,
-        checkpointer=memory,  
-    )
-    
-    print(f"ESTIN RAG Agent created with model: {model_name} (with memory)")
-    
-    return agent
-
-
-def _get_system_prompt() -> str:
-    
-    return """Tu es un assistant spécialisé dans le règlement intérieur de l'ESTIN 
+# 💡 Module-level constant: byte-identical on every call, so the provider's
+# prompt cache can reuse it (never interpolate per-request data here)
+_SYSTEM_PROMPT = """Tu es un assistant spécialisé dans le règlement intérieur de l'ESTIN 
 (École Supérieure en Sciences et Technologies de l'Informatique et du Numérique).
 
 🎯 TON RÔLE:
@@ -73,7 +38,7 @@ def _get_system_prompt() -> str:
 - Maintenir la cohérence avec les messages précédents de la conversation
 
 📝 FORMAT DE RÉPONSE:
-1. Pour les questions sur le règlement: Utilise l'outil de recherche pour trouver les articles pertinents
+1. Pour les questions sur le règlement: Effectue UNE SEULE recherche avec une requête riche et détaillée (elle renvoie plusieurs articles, c'est généralement suffisant)
 2. Cite les numéros d'articles concernés
 3. Explique clairement la règle ou la disposition
 4. Si plusieurs articles s'appliquent, mentionne-les tous
@@ -97,6 +62,130 @@ Le règlement intérieur couvre:
 - Le régime disciplinaire
 - Les dispositions finales"""
 
+# Fingerprint logged at agent creation, so an edit that invalidates the
+# provider-side prompt cache is visible in the logs
+_SYSTEM_PROMPT_SHA256 = hashlib.sha256(_SYSTEM_PROMPT.encode()).hexdigest()[:12]
+
+
+def create_estin_agent(
+    groq_api_key: str,
+    vector_store: VectorStore,
+    model_name: str = "openai/gpt-oss-120b",
+    temperature: float = 0.1,
+    k: int = 6,
+    bm25_index: Optional[BM25Index] = None,
+    mmr: bool = False,
+):
+    # Initialize the LLM (shared across agents with the same settings)
+    llm = _get_llm(groq_api_key, model_name, temperature)
+    
+    # Create the retrieval tools (single query, and several queries at once
+    # for models that would otherwise issue parallel tool calls)
+    # 💡 A larger k lets one search answer most questions, saving LLM turns;
+    # mmr keeps those k results diverse
+    # 💡 With a BM25 index, results are a hybrid of dense + lexical rankings
+    # Both tools feed one embedding batcher, so their queries can share a call
+    batcher = AsyncEmbeddingBatcher(vector_store.embeddings)
+    retrieval_tool = create_retrieval_tool(
+        vector_store, k=k, bm25_index=bm25_index, batcher=batcher, mmr=mmr
+    )
+    batch_retrieval_tool = create_batch_retrieval_tool(
+        vector_store, k=k, bm25_index=bm25_index, batcher=batcher, mmr=mmr
+    )
+    
+    # Create memory/checkpointer to persist conversation history
+    memory = MemorySaver()
+    
+    # Create the agent with memory
+    agent = create_agent(
+        model=llm,
+        tools=[retrieval_tool, batch_retrieval_tool],
+        # 💡 The static system prompt and tool definitions form the same
+        # prefix on every call, so the provider can skip re-processing them
+        system_prompt=_SYSTEM_PROMPT,
+        checkpointer=memory,  
+    )
+    
+    print(
+        f"ESTIN RAG Agent created with model: {model_name} (with memory, "
+        f"system prompt {_SYSTEM_PROMPT_SHA256})"
+    )
+    
+    return agent
+
+
+# Connection pool shared by the Groq clients
+_GROQ_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+
+
+@lru_cache(maxsize=8)
+def _get_llm(groq_api_key: str, model_name: str, temperature: float) -> ChatGroq:
+    # 💡 One client per settings for the whole process: new agents reuse its
+    # warm connections (no new TLS handshake), and HTTP/2 multiplexes
+    # concurrent streamed completions over one connection.
+    # The key is passed to the client, not written to os.environ: no
+    # process-global state shared between concurrent callers
+    return ChatGroq(
+        api_key=groq_api_key,
+        model=model_name,
+        temperature=temperature,
+        max_retries=2,
+        http_client=httpx.Client(http2=True, limits=_GROQ_LIMITS),
+        http_async_client=httpx.AsyncClient(http2=True, limits=_GROQ_LIMITS),
+    )
+
+
+def stream_agent(
+    agent,
+    question: str,
+    thread_id: str,
+) -> Iterator[Tuple[str, Any]]:
+    """Yield ("token", text) as the model generates the answer, then
+    ("result", state) once, with the same value invoke_agent returns."""
+    config = {"configurable": {"thread_id": thread_id}}
+    result = None
+    
+    for mode, payload in agent.stream(
+        {"messages": [HumanMessage(content=question)]},
+        config=config,
+        stream_mode=["messages", "values"],
+    ):
+        if mode == "values":
+            result = payload
+        elif _is_answer_text(payload[0]):
+            yield "token", payload[0].content
+    
+    # 💡 The state from the run itself: the checkpointer's copy has the
+    # tool artifacts (retrieved Documents) serialized to plain dicts
+    yield "result", result
+
+
+async def astream_agent(
+    agent,
+    question: str,
+    thread_id: str,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Async counterpart of stream_agent, for use from the API event loop."""
+    config = {"configurable": {"thread_id": thread_id}}
+    result = None
+    
+    async for mode, payload in agent.astream(
+        {"messages": [HumanMessage(content=question)]},
+        config=config,
+        stream_mode=["messages", "values"],
+    ):
+        if mode == "values":
+            result = payload
+        elif _is_answer_text(payload[0]):
+            yield "token", payload[0].content
+    
+    yield "result", result
+
+
+def _is_answer_text(chunk) -> bool:
+    # Model text only (tool results and empty tool-call chunks skipped)
+    return isinstance(chunk, AIMessageChunk) and isinstance(chunk.content, str) and bool(chunk.content)
+
 
 def invoke_agent(
     agent,
@@ -104,9 +193,21 @@ def invoke_agent(
     thread_id: str,
 ) -> Dict[str, Any]:
     
+    # 💡 Built on stream_agent: the same run, keeping only its final state
+    for kind, payload in stream_agent(agent, question, thread_id):
+        if kind == "result":
+            return payload
+
+
+async def ainvoke_agent(
+    agent,
+    question: str,
+    thread_id: str,
+) -> Dict[str, Any]:
+    """Async counterpart of invoke_agent, for use from the API event loop."""
     config = {"configurable": {"thread_id": thread_id}}
     
-    result = agent.invoke(
+    result = await agent.ainvoke(
         {"messages": [HumanMessage(content=question)]},
         config=config,
     )
@@ -114,6 +215,32 @@ def invoke_agent(
     return result
 
 
+def record_exchange(
+    agent,
+    question: str,
+    answer: str,
+    thread_id: str,
+) -> None:
+    """Write a question/answer pair into a thread's memory without calling the LLM.
+
+    Used when an answer is served from cache, so follow-up questions on the
+    thread still see the first exchange.
+    """
+    config = {"configurable": {"thread_id": thread_id}}
+    
+    agent.update_state(
+        config,
+        {"messages": [HumanMessage(content=question), AIMessage(content=answer)]},
+        as_node="model",
+    )
+
+
+def warm_up_agent(agent) -> None:
+    """Send one throwaway question so the shared prompt prefix gets cached."""
+    invoke_agent(agent, "Bonjour", thread_id="warmup")
+    print("Agent warm-up completed")
+
+
 def get_last_message(result: Dict[str, Any]) -> str:
 
     messages = result.get("messages", [])
@@ -0,0 +1,69 @@
+
+from typing import List
+import bm25s
+from langchain_core.documents import Document
+
+from src.vectorstore.topk import topk
+
+
+# 💡 The whole règlement fits in memory: BM25 runs in-process next to the
+# Pinecone search and both rankings are merged with reciprocal rank fusion
+class BM25Index:
+    """In-memory BM25 index over a fixed list of chunks."""
+
+    def __init__(self, documents: List[Document]):
+        self.documents = documents
+        
+        corpus_tokens = bm25s.tokenize(
+            [doc.page_content for doc in documents],
+            stopwords="fr",
+            show_progress=False,
+        )
+        self.retriever = bm25s.BM25()
+        self.retriever.index(corpus_tokens, show_progress=False)
+        
+        # 💡 Numba-compiled scoring when numba is installed (optional)
+        try:
+            self.retriever.activate_numba_scorer()
+        except ImportError:
+            pass
+        
+        print(f"BM25 index built over {len(documents)} chunks")
+
+    def search(self, query: str, k: int = 4) -> List[Document]:
+        k = min(k, len(self.documents))
+        if k == 0:
+            return []
+        
+        query_tokens = bm25s.tokenize(
+            query, stopwords="fr", return_ids=False, show_progress=False
+        )[0]
+        # 💡 Score every chunk, then select the k best with a bounded heap
+        # (numba-compiled when available) instead of sorting all scores
+        indices, scores = topk(self.retriever.get_scores(query_tokens), k)
+        
+        # Drop documents that share no term with the query
+        return [
+            self.documents[i]
+            for i, score in zip(indices, scores)
+            if score > 0
+        ]
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Document]],
+    k: int,
+    rrf_k: int = 60,
+) -> List[Document]:
+    """Merge ranked lists: each document scores sum(1 / (rrf_k + rank))."""
+    scores = {}
+    documents = {}
+    
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[key] for key in best]
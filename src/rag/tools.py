@@ -1,60 +1,238 @@
-from typing import List, Tuple
-from langchain.tools import tool
+import asyncio
+import threading
+import unicodedata
+from typing import List, Optional, Tuple
+from cachetools import TTLCache
+from langchain_core.tools import StructuredTool
 from langchain_core.documents import Document
-from langchain_pinecone import PineconeVectorStore
+from langchain_core.vectorstores import VectorStore
+
+from src.data_processing import build_source_label
+from src.embeddings import AsyncEmbeddingBatcher, embed_queries
+from .hybrid_retrieval import BM25Index, reciprocal_rank_fusion
+
+
+# Cached search results per tool: a repeated query skips both the embedding
+# call and the Pinecone round-trip
+RETRIEVAL_CACHE_SIZE = 1024
+RETRIEVAL_CACHE_TTL = 3600
+
+# Maximal marginal relevance: candidates fetched, and relevance/diversity trade-off
+MMR_FETCH_K = 30
+MMR_LAMBDA_MULT = 0.5
+
+# Section/subsection metadata fields, in build_source_label argument order
+_META_KEYS = ("section_number", "section_title", "subsection_number", "subsection_title")
+
+# Layout of one search result in the tool output
+_RESULT_TEMPLATE = "**[Résultat {index}]**\n📍 Source: {source}\n{article_line}\n{content}"
 
 
 def create_retrieval_tool(
-    vector_store: PineconeVectorStore,
+    vector_store: VectorStore,
     k: int = 4,
+    bm25_index: Optional[BM25Index] = None,
+    batcher: Optional[AsyncEmbeddingBatcher] = None,
+    mmr: bool = False,
 ):
+    # 💡 Concurrent requests share embedding calls through the batcher
+    if batcher is None:
+        batcher = AsyncEmbeddingBatcher(vector_store.embeddings)
+    # 💡 One cache per tool: results depend on the store, k, mmr and BM25
+    # settings this tool was built with
+    cache = _RetrievalCache()
     
-    
-    @tool(response_format="content_and_artifact")
     def retrieve_estin_regulations(query: str) -> Tuple[str, List[Document]]:
         """Recherche dans le règlement intérieur ESTIN les articles pertinents pour une question donnée (en français)."""
-        # Search for relevant documents
-        retrieved_docs = vector_store.similarity_search(query, k=k)
-        
-        # Format the results with source information
-        serialized = "\n\n---\n\n".join(
-            _format_document(doc, i) for i, doc in enumerate(retrieved_docs, 1)
-        )
+        retrieved_docs = cache.get(query)
+        if retrieved_docs is None:
+            # Search for relevant documents
+            if mmr:
+                retrieved_docs = vector_store.max_marginal_relevance_search(
+                    query, k=k, fetch_k=MMR_FETCH_K, lambda_mult=MMR_LAMBDA_MULT
+                )
+            else:
+                retrieved_docs = vector_store.similarity_search(query, k=k)
+            retrieved_docs = _fuse(bm25_index, query, retrieved_docs, k)
+            cache.set(query, retrieved_docs)
         
-        # Add header
-        result = f"{len(retrieved_docs)} articles trouvés dans le règlement intérieur:\n\n{serialized}"
+        return _serialize_results(retrieved_docs), retrieved_docs
+    
+    async def aretrieve_estin_regulations(query: str) -> Tuple[str, List[Document]]:
+        # 💡 Async variant used by agent.ainvoke: the event loop is free while
+        # the query is embedded and sent to Pinecone
+        retrieved_docs = cache.get(query)
+        if retrieved_docs is None:
+            vector = await batcher.embed(query)
+            retrieved_docs = await _asearch_by_vector(vector_store, vector, k, mmr)
+            retrieved_docs = _fuse(bm25_index, query, retrieved_docs, k)
+            cache.set(query, retrieved_docs)
         
-        return result, retrieved_docs
+        return _serialize_results(retrieved_docs), retrieved_docs
     
-    return retrieve_estin_regulations
+    return StructuredTool.from_function(
+        func=retrieve_estin_regulations,
+        coroutine=aretrieve_estin_regulations,
+        response_format="content_and_artifact",
+    )
 
 
-def _format_document(doc: Document, index: int) -> str:
-    metadata = doc.metadata
-    
-    # Extract relevant metadata
-    article_num = metadata.get("article_number", "N/A")
-    section_num = metadata.get("section_number", "")
-    section_title = metadata.get("section_title", "")
-    subsection_num = metadata.get("subsection_number", "")
-    subsection_title = metadata.get("subsection_title", "")
+def create_batch_retrieval_tool(
+    vector_store: VectorStore,
+    k: int = 4,
+    bm25_index: Optional[BM25Index] = None,
+    batcher: Optional[AsyncEmbeddingBatcher] = None,
+    mmr: bool = False,
+):
+    # 💡 Concurrent requests share embedding calls through the batcher
+    if batcher is None:
+        batcher = AsyncEmbeddingBatcher(vector_store.embeddings)
+    # 💡 One cache per tool: results depend on the store, k, mmr and BM25
+    # settings this tool was built with
+    cache = _RetrievalCache()
     
-    # Build source string
-    source_parts = []
-    if section_num and section_title:
-        source_parts.append(f"Section {section_num}: {section_title}")
-    if subsection_num and subsection_title:
-        source_parts.append(f"Sous-section {subsection_num}: {subsection_title}")
+    def retrieve_estin_regulations_batch(queries: List[str]) -> Tuple[str, List[Document]]:
+        """Recherche en une seule fois plusieurs requêtes (en français) dans le règlement intérieur ESTIN. À utiliser quand une question porte sur plusieurs sujets."""
+        results = [cache.get(query) for query in queries]
+        missing = [i for i, docs in enumerate(results) if docs is None]
+        
+        if missing:
+            vectors = embed_queries(vector_store.embeddings, [queries[i] for i in missing])
+            for i, vector in zip(missing, vectors):
+                dense_docs = _search_by_vector(vector_store, vector, k, mmr)
+                results[i] = _fuse(bm25_index, queries[i], dense_docs, k)
+                cache.set(queries[i], results[i])
+        
+        retrieved_docs = _merge_results(results)
+        return _serialize_results(retrieved_docs), retrieved_docs
     
-    source_str = " > ".join(source_parts) if source_parts else "Règlement Intérieur ESTIN"
+    async def aretrieve_estin_regulations_batch(queries: List[str]) -> Tuple[str, List[Document]]:
+        # 💡 All uncached queries are embedded in one batch, then the Pinecone
+        # searches run concurrently: one round-trip of latency, not one per query
+        results = [cache.get(query) for query in queries]
+        missing = [i for i, docs in enumerate(results) if docs is None]
+        
+        if missing:
+            vectors = await asyncio.gather(*(
+                batcher.embed(queries[i]) for i in missing
+            ))
+            searched = await asyncio.gather(*(
+                _asearch_by_vector(vector_store, vector, k, mmr)
+                for vector in vectors
+            ))
+            for i, dense_docs in zip(missing, searched):
+                results[i] = _fuse(bm25_index, queries[i], dense_docs, k)
+                cache.set(queries[i], results[i])
+        
+        retrieved_docs = _merge_results(results)
+        return _serialize_results(retrieved_docs), retrieved_docs
     
-    # Format output
-    formatted = f"**[Résultat {index}]**\n"
-    formatted += f"📍 Source: {source_str}\n"
-    if article_num != "N/A":
-        formatted += f"📄 Article: {article_num}\n"
-    formatted += f"\n{doc.page_content}"
+    return StructuredTool.from_function(
+        func=retrieve_estin_regulations_batch,
+        coroutine=aretrieve_estin_regulations_batch,
+        response_format="content_and_artifact",
+    )
+
+
+def _search_by_vector(
+    vector_store: VectorStore,
+    vector: List[float],
+    k: int,
+    mmr: bool,
+) -> List[Document]:
+    # 💡 MMR keeps a larger k from returning near-duplicate chunks
+    if mmr:
+        return vector_store.max_marginal_relevance_search_by_vector(
+            vector, k=k, fetch_k=MMR_FETCH_K, lambda_mult=MMR_LAMBDA_MULT
+        )
+    return vector_store.similarity_search_by_vector(vector, k=k)
+
+
+async def _asearch_by_vector(
+    vector_store: VectorStore,
+    vector: List[float],
+    k: int,
+    mmr: bool,
+) -> List[Document]:
+    # 💡 The sync search runs in a worker thread on the cached index handle
+    # and its connection pool. PineconeVectorStore's native async methods
+    # open a new async client (and TLS session) on every call.
+    return await asyncio.to_thread(_search_by_vector, vector_store, vector, k, mmr)
+
+
+def _fuse(
+    bm25_index: Optional[BM25Index],
+    query: str,
+    dense_docs: List[Document],
+    k: int,
+) -> List[Document]:
+    # Dense results alone, or fused with the in-process BM25 ranking
+    # 💡 BM25 runs in-process in about a millisecond, so it adds no network
+    # round-trip next to the Pinecone search
+    if bm25_index is None:
+        return dense_docs
+    return reciprocal_rank_fusion([dense_docs, bm25_index.search(query, k)], k)
+
+
+class _RetrievalCache:
+    """Thread-safe TTL cache of one tool's search results, keyed by query."""
+
+    def __init__(self):
+        self._cache: TTLCache = TTLCache(
+            maxsize=RETRIEVAL_CACHE_SIZE, ttl=RETRIEVAL_CACHE_TTL
+        )
+        self._lock = threading.Lock()
+
+    def get(self, query: str) -> Optional[List[Document]]:
+        with self._lock:
+            return self._cache.get(_cache_key(query))
+
+    def set(self, query: str, docs: List[Document]) -> None:
+        with self._lock:
+            self._cache[_cache_key(query)] = docs
+
+
+def _cache_key(query: str) -> str:
+    # "Hygiène " and "hygiène" share an entry
+    return unicodedata.normalize("NFKC", query).strip().lower()
+
+
+def _merge_results(results: List[List[Document]]) -> List[Document]:
+    # Flatten per-query results, keeping the first occurrence of each article
+    seen = set()
+    merged = []
+    for docs in results:
+        for doc in docs:
+            if doc.page_content not in seen:
+                seen.add(doc.page_content)
+                merged.append(doc)
+    return merged
+
+
+def _serialize_results(retrieved_docs: List[Document]) -> str:
+    # Format the results with source information
+    serialized = "\n\n---\n\n".join(
+        _format_document(doc, i) for i, doc in enumerate(retrieved_docs, 1)
+    )
     
-    return formatted
+    # Add header
+    return f"{len(retrieved_docs)} articles trouvés dans le règlement intérieur:\n\n{serialized}"
 
 
+def _format_document(doc: Document, index: int) -> str:
+    metadata = doc.metadata
+    article_num = metadata.get("article_number")
+    
+    # 💡 Precomputed at ingest; rebuilt only for chunks indexed before
+    # source_label existed
+    source = metadata.get("source_label")
+    if source is None:
+        source = build_source_label(*[metadata.get(key, "") for key in _META_KEYS])
+    
+    # Format output in one pass over a fixed template
+    return _RESULT_TEMPLATE.format(
+        index=index,
+        source=source,
+        article_line=f"📄 Article: {article_num}\n" if article_num is not None else "",
+        content=doc.page_content,
+    )
@@ -1,17 +1,25 @@
+# 💡 The FAISS backend (faiss_store) is optional and not imported here:
+# import src.vectorstore.faiss_store only when VECTOR_BACKEND=faiss
 from .store import (
     init_pinecone,
     create_index_if_not_exists,
     create_vector_store,
+    upsert_parallel,
     load_vector_store,
     similarity_search,
+    warmup,
     delete_index,
 )
+from .topk import topk
 
 __all__ = [
     "init_pinecone",
     "create_index_if_not_exists",
     "create_vector_store",
+    "upsert_parallel",
     "load_vector_store",
     "similarity_search",
+    "warmup",
     "delete_index",
+    "topk",
 ]
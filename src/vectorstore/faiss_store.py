@@ -0,0 +1,79 @@
+
+import logging
+from pathlib import Path
+from typing import List, Optional
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from .store import _embed_in_batches
+
+
+log = logging.getLogger(__name__)
+
+# HNSW graph parameters: neighbours per node, and candidate list sizes at
+# build and query time
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+
+def create_faiss_store(
+    documents: List[Document],
+    embeddings: Embeddings,
+    persist_dir: str,
+    vectors: Optional[List[List[float]]] = None,
+) -> FAISS:
+    
+    # 💡 A few thousand chunks fit in memory: an in-process HNSW lookup
+    # replaces the network round-trip to Pinecone (local/dev/CI)
+    if vectors is None:
+        vectors = _embed_in_batches(embeddings, documents)
+    
+    matrix = np.asarray(vectors, dtype=np.float32)
+    # 💡 Unit vectors: L2 ranking is then the same as cosine ranking
+    faiss.normalize_L2(matrix)
+    
+    index = faiss.IndexHNSWFlat(matrix.shape[1], HNSW_M)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    index.add(matrix)
+    
+    ids = [str(i) for i in range(len(documents))]
+    vector_store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, documents))),
+        index_to_docstore_id=dict(enumerate(ids)),
+        normalize_L2=True,
+    )
+    
+    # Writes the index (faiss.write_index) and the docstore next to it
+    Path(persist_dir).mkdir(parents=True, exist_ok=True)
+    vector_store.save_local(persist_dir)
+    
+    log.info("FAISS store created with %d vectors in %s", index.ntotal, persist_dir)
+    
+    return vector_store
+
+
+def load_faiss_store(
+    embeddings: Embeddings,
+    persist_dir: str,
+) -> FAISS:
+    
+    # 💡 The docstore is a pickle written by create_faiss_store; only load
+    # directories produced by build_index
+    vector_store = FAISS.load_local(
+        persist_dir,
+        embeddings,
+        allow_dangerous_deserialization=True,
+        normalize_L2=True,
+    )
+    
+    log.info("Loaded FAISS store with %d vectors", vector_store.index.ntotal)
+    
+    return vector_store
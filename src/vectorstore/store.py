@@ -1,19 +1,53 @@
 
-import os
+import asyncio
+import logging
+from functools import lru_cache
 from typing import List, Optional
+from uuid import uuid4
+import numpy as np
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_pinecone import PineconeVectorStore
+from langchain_core.vectorstores import VectorStore
 from pinecone import Pinecone, ServerlessSpec
 
+from src.embeddings import aembed_queries
+from .topk import topk
+
+
+# 💡 Lazy %-formatting: messages below the configured level cost nothing
+log = logging.getLogger(__name__)
+
+
+# Texts per embeddings call when a store embeds documents itself
+# 💡 TEI rejects requests above --max-client-batch-size (32 by default)
+EMBED_BATCH_SIZE = 32
+# Pinecone recommends upserts of ~100 vectors per request
+UPSERT_BATCH_SIZE = 100
+# Size of the client's thread pool used for async_req upserts
+UPSERT_POOL_THREADS = 30
+
 
 def init_pinecone(api_key: str) -> Pinecone:
     
-    pc = Pinecone(api_key=api_key)
-    print("Pinecone client initialized")
+    pc = _get_pc(api_key)
+    log.debug("Pinecone client initialized")
     return pc
 
 
+@lru_cache(maxsize=4)
+def _get_pc(api_key: str) -> Pinecone:
+    # 💡 One client per API key for the whole process: its HTTPS connection
+    # pool (and TLS sessions) are reused instead of rebuilt on every call
+    return Pinecone(api_key=api_key, pool_threads=UPSERT_POOL_THREADS)
+
+
+@lru_cache(maxsize=8)
+def _get_index(api_key: str, index_name: str):
+    # Index handles keep their own connection pool; reuse them too
+    return _get_pc(api_key).Index(index_name, pool_threads=UPSERT_POOL_THREADS)
+
+
 def create_index_if_not_exists(
     pc: Pinecone,
     index_name: str,
@@ -26,16 +60,16 @@ def create_index_if_not_exists(
     existing_indexes = [idx.name for idx in pc.list_indexes()]
     
     if index_name not in existing_indexes:
-        print(f"🔨 Creating Pinecone index: {index_name}")
+        log.info("Creating Pinecone index: %s", index_name)
         pc.create_index(
             name=index_name,
             dimension=dimension,
             metric=metric,
             spec=ServerlessSpec(cloud=cloud, region=region),
         )
-        print(f"✅ Index '{index_name}' created successfully")
+        log.info("Index '%s' created successfully", index_name)
     else:
-        print(f"📌 Index '{index_name}' already exists")
+        log.debug("Index '%s' already exists", index_name)
 
 
 def create_vector_store(
@@ -43,48 +77,105 @@ def create_vector_store(
     embeddings: Embeddings,
     pinecone_api_key: str,
     index_name: str = "estin-regulations",
+    vectors: Optional[List[List[float]]] = None,
+    cloud: str = "aws",
+    region: str = "us-east-1",
 ) -> PineconeVectorStore:
    
     # Initialize Pinecone
     pc = init_pinecone(pinecone_api_key)
     
     # Create index if needed (1024 is the dimension for multilingual-e5-large)
-    create_index_if_not_exists(pc, index_name, dimension=1024)
+    # 💡 Pick the region closest to the API deployment: every query pays the
+    # network round-trip to it
+    create_index_if_not_exists(
+        pc, index_name, dimension=1024, cloud=cloud, region=region
+    )
     
     # Get the index
-    index = pc.Index(index_name)
+    # 💡 pool_threads sizes the thread pool behind upsert(async_req=True)
+    index = _get_index(pinecone_api_key, index_name)
     
+    # 💡 Precomputed vectors (e.g. from embed_documents_batched) are used as
+    # is; otherwise documents are embedded here in fixed-size batches
+    if vectors is None:
+        vectors = _embed_in_batches(embeddings, documents)
     
-    original_api_key = os.environ.get("PINECONE_API_KEY")
-    os.environ["PINECONE_API_KEY"] = pinecone_api_key
+    records = _to_pinecone_records(documents, vectors)
+    if len(records) > UPSERT_BATCH_SIZE:
+        upsert_parallel(index, records)
+    else:
+        index.upsert(vectors=records)
     
-    try:
-        vector_store = PineconeVectorStore.from_documents(
-            documents=documents,
-            embedding=embeddings,
-            index_name=index_name,
-        )
-    except Exception as e:
-        print(f"Error creating vector store: {e}")
+    vector_store = PineconeVectorStore(index=index, embedding=embeddings)
     
-    print(f"Vector store created successfully!")
+    log.info("Vector store created successfully")
     
     return vector_store
 
 
+def _embed_in_batches(
+    embeddings: Embeddings,
+    documents: List[Document],
+    batch_size: int = EMBED_BATCH_SIZE,
+) -> List[List[float]]:
+    texts = [doc.page_content for doc in documents]
+    vectors = []
+    
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embeddings.embed_documents(texts[start:start + batch_size]))
+        log.debug("Embedded %d/%d chunks", len(vectors), len(texts))
+    
+    return vectors
+
+
+def _to_pinecone_records(
+    documents: List[Document],
+    vectors: List[List[float]],
+) -> List[dict]:
+    # Same layout as PineconeVectorStore: the chunk text lives under "text"
+    return [
+        {
+            "id": str(uuid4()),
+            "values": vector,
+            "metadata": {**doc.metadata, "text": doc.page_content},
+        }
+        for doc, vector in zip(documents, vectors)
+    ]
+
+
+def upsert_parallel(
+    index,
+    vectors: List[dict],
+    batch_size: int = UPSERT_BATCH_SIZE,
+) -> None:
+    """Upsert vectors in batches, all batches in flight at once.
+
+    The index must be created with `pc.Index(name, pool_threads=N)`; up to N
+    batches are sent concurrently.
+    """
+    async_results = [
+        index.upsert(vectors=vectors[start:start + batch_size], async_req=True)
+        for start in range(0, len(vectors), batch_size)
+    ]
+    
+    # Wait for every batch (re-raises the first failure)
+    for async_result in async_results:
+        async_result.get()
+    
+    log.info("Upserted %d vectors in %d batches", len(vectors), len(async_results))
+
+
 def load_vector_store(
     embeddings: Embeddings,
     pinecone_api_key: str,
     index_name: str = "estin-regulations",
 ) -> PineconeVectorStore:
 
-    # Initialize Pinecone
-    pc = init_pinecone(pinecone_api_key)
-    
     # Get the index
-    index = pc.Index(index_name)
+    index = _get_index(pinecone_api_key, index_name)
     
-    print(f"Loading vector store from index: {index_name}")
+    log.info("Loading vector store from index: %s", index_name)
     
     vector_store = PineconeVectorStore(
         index=index,
@@ -95,19 +186,52 @@ def load_vector_store(
     stats = index.describe_index_stats()
     total_vectors = stats.total_vector_count
     
-    print(f"Loaded vector store with {total_vectors} vectors")
+    log.info("Loaded vector store with %d vectors", total_vectors)
     
     return vector_store
 
 
 def similarity_search(
-    vector_store: PineconeVectorStore,
+    vector_store: VectorStore,
     query: str,
     k: int = 4,
+    filter: Optional[dict] = None,
+    namespace: Optional[str] = None,
+    **kwargs,
 ) -> List[Document]:
-    
-    results = vector_store.similarity_search(query, k=k)
-    return results
+    """Search the store, forwarding any extra options to the backend.
+
+    `filter` restricts the search on chunk metadata before ranking, e.g.
+    `filter={"section_number": {"$eq": "3"}}` to search one section only.
+    """
+    # namespace is Pinecone-only; leave it out for other backends
+    if namespace is not None:
+        kwargs["namespace"] = namespace
+    
+    return vector_store.similarity_search(query, k=k, filter=filter, **kwargs)
+
+
+# Vector stores already warmed up in this process (by id)
+_warmed_up = set()
+
+
+async def warmup(vector_store: VectorStore) -> None:
+    """Run one throwaway search so the first user query skips cold-start costs."""
+    if id(vector_store) in _warmed_up:
+        return
+    
+    # 💡 Same path as the API's retrieval tools: queries embedded through the
+    # async embeddings client, then a sync search on the cached index handle
+    # in a worker thread. This loads the model behind the endpoint and opens
+    # both connections (TLS handshakes) before any user request.
+    vector = (await aembed_queries(vector_store.embeddings, ["ping"]))[0]
+    await asyncio.to_thread(vector_store.similarity_search_by_vector, vector, k=1)
+    
+    # Compile (or load from cache) the numba top-k used by BM25 search
+    await asyncio.to_thread(topk, np.zeros(8, dtype=np.float32), 1)
+    
+    _warmed_up.add(id(vector_store))
+    log.info("Vector store warm-up completed")
 
 
 def delete_index(
@@ -117,4 +241,7 @@ def delete_index(
     
     pc = init_pinecone(pinecone_api_key)
     pc.delete_index(index_name)
-    print(f"Index '{index_name}' deleted")
+    
+    # A re-created index gets a new host, so drop any cached handle
+    _get_index.cache_clear()
+    log.info("Index '%s' deleted", index_name)
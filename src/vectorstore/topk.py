@@ -0,0 +1,76 @@
+
+import numpy as np
+
+# 💡 numba is optional: without it the same selection runs on NumPy
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def topk(scores: np.ndarray, k: int):
+    """Indices and values of the k largest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), scores[:0]
+    
+    if numba is not None:
+        return _topk_numba(scores, k)
+    return _topk_numpy(scores, k)
+
+
+def _topk_numpy(scores: np.ndarray, k: int):
+    indices = np.argpartition(-scores, k - 1)[:k]
+    order = np.argsort(-scores[indices], kind="stable")
+    return indices[order], scores[indices[order]]
+
+
+def _topk_heap(scores, k):
+    # Bounded min-heap of the k best scores seen so far: one pass over the
+    # array, no full sort and no allocation beyond the k slots
+    values = np.empty(k, dtype=scores.dtype)
+    indices = np.empty(k, dtype=np.int64)
+    size = 0
+    
+    for i in range(scores.shape[0]):
+        score = scores[i]
+        
+        if size < k:
+            # Push, then sift up
+            pos = size
+            size += 1
+            while pos > 0:
+                parent = (pos - 1) // 2
+                if values[parent] <= score:
+                    break
+                values[pos] = values[parent]
+                indices[pos] = indices[parent]
+                pos = parent
+            values[pos] = score
+            indices[pos] = i
+        
+        elif score > values[0]:
+            # Replace the smallest, then sift down
+            pos = 0
+            while True:
+                child = 2 * pos + 1
+                if child >= k:
+                    break
+                if child + 1 < k and values[child + 1] < values[child]:
+                    child += 1
+                if values[child] >= score:
+                    break
+                values[pos] = values[child]
+                indices[pos] = indices[child]
+                pos = child
+            values[pos] = score
+            indices[pos] = i
+    
+    order = np.argsort(-values, kind="mergesort")
+    return indices[order], values[order]
+
+
+if numba is not None:
+    # 💡 cache=True stores the compiled function next to this module, so only
+    # the first run pays the compilation
+    _topk_numba = numba.njit(cache=True)(_topk_heap)